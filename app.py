@@ -2,11 +2,25 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date, timezone
 import json
+import os
+import csv
+import io
 import uuid
-from typing import Dict, List, Any
+import re
+import difflib
+import heapq
+import itertools
+import threading
+import weakref
+import time
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Dict, List, Any, Optional, Callable
 import numpy as np
+from cohort_analytics import compute_cohort_stats
 
 # Configure page
 st.set_page_config(
@@ -147,13 +161,112 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# A session's plans keyed by id, with their versions alongside; a dict
+# subclass so the cohort registry can hold it weakly
+class PlanStore(dict):
+    def __init__(self):
+        super().__init__()
+        self.versions = {}
+
 # Initialize session state
 if 'study_plans' not in st.session_state:
-    st.session_state.study_plans = []
+    st.session_state.study_plans = PlanStore()
+if 'session_key' not in st.session_state:
+    st.session_state.session_key = str(uuid.uuid4())
+if 'plan_versions' not in st.session_state:
+    st.session_state.plan_versions = st.session_state.study_plans.versions
+if 'plan_summaries' not in st.session_state:
+    st.session_state.plan_summaries = {}
 if 'current_view' not in st.session_state:
     st.session_state.current_view = 'dashboard'
-if 'selected_plan' not in st.session_state:
-    st.session_state.selected_plan = None
+if 'selected_plan_id' not in st.session_state:
+    st.session_state.selected_plan_id = None
+if 'plan_jobs' not in st.session_state:
+    st.session_state.plan_jobs = {}
+if 'finished_jobs' not in st.session_state:
+    st.session_state.finished_jobs = []
+if 'pending_export' not in st.session_state:
+    st.session_state.pending_export = None
+if 'trace_recorder' not in st.session_state:
+    st.session_state.trace_recorder = None
+if 'plans_to_import' not in st.session_state:
+    st.session_state.plans_to_import = []
+if 'study_log_to_import' not in st.session_state:
+    st.session_state.study_log_to_import = []
+if 'expanded_categories' not in st.session_state:
+    st.session_state.expanded_categories = set()
+
+TOPIC_ALIASES = {
+    'calc': 'calculus',
+    'stats': 'statistics',
+    'stat': 'statistics',
+    'trig': 'trigonometry',
+    'geo': 'geometry',
+    'bio': 'biology',
+    'chem': 'chemistry',
+    'phys': 'physics',
+    'vocab': 'vocabulary',
+    'lit': 'literature',
+    'ww': 'world wars',
+    'wwi': 'world wars',
+    'wwii': 'world wars',
+    'ww1': 'world wars',
+    'ww2': 'world wars',
+    'world war': 'world wars',
+    'lit review': 'literature review'
+}
+TOPIC_STOPWORDS = {'and', 'of', 'the', 'in', 'to', 'for', 'a', 'an', 'basics', 'fundamentals'}
+WEAKNESS_FUZZY_CUTOFF = 0.85
+WEAKNESS_HOURS_FACTOR = 1.5
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+def normalize_topic(text: str) -> List[str]:
+    tokens = [t for t in tokenize(text) if t not in TOPIC_STOPWORDS]
+    phrase = ' '.join(tokens)
+    if phrase in TOPIC_ALIASES:
+        return TOPIC_ALIASES[phrase].split()
+    return ' '.join(TOPIC_ALIASES.get(t, t) for t in tokens).split()
+
+# Built once per plan from the user's weaknesses; a topic is weak when its
+# normalized phrase contains, or is contained in, a weakness phrase ("history"
+# covers "Modern History", "Modern History" does not cover "Ancient History"),
+# falling back to a fuzzy match on the whole phrase for typos. Phrases are
+# indexed by token, so a topic is only compared with phrases it shares a word
+# with (or, for the fuzzy fallback, all phrases when it shares none).
+class WeaknessMatcher:
+    def __init__(self, weaknesses: List[str], fuzzy: bool = True):
+        self.phrases = {}
+        self.by_token = {}
+        for weakness in weaknesses:
+            tokens = normalize_topic(weakness)
+            if tokens:
+                phrase = ' '.join(tokens)
+                self.phrases[phrase] = frozenset(tokens)
+                for token in tokens:
+                    self.by_token.setdefault(token, set()).add(phrase)
+        self.fuzzy = fuzzy
+        self._cache = {}
+
+    def is_weak(self, topic: str) -> bool:
+        if topic not in self._cache:
+            self._cache[topic] = self._match(topic)
+        return self._cache[topic]
+
+    def _match(self, topic: str) -> bool:
+        tokens = normalize_topic(topic)
+        if not tokens or not self.phrases:
+            return False
+        phrase, token_set = ' '.join(tokens), frozenset(tokens)
+        if phrase in self.phrases:
+            return True
+        candidates = set().union(*(self.by_token.get(t, ()) for t in token_set))
+        if any(token_set <= self.phrases[c] or self.phrases[c] <= token_set for c in candidates):
+            return True
+        if self.fuzzy:
+            return bool(difflib.get_close_matches(phrase, candidates or self.phrases, n=1, cutoff=WEAKNESS_FUZZY_CUTOFF))
+        return False
 
 class StudyPlanGenerator:
     def __init__(self):
@@ -179,13 +292,18 @@ class StudyPlanGenerator:
             'finalization': ['Documentation', 'Presentation Prep', 'Final Review', 'Submission']
         }
     
-    def generate_study_plan(self, form_data: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_study_plan(self, form_data: Dict[str, Any], progress: Optional[Callable[[float, str], None]] = None) -> Dict[str, Any]:
+        progress = progress or (lambda fraction, message: None)
         start_date = datetime.strptime(form_data['start_date'], '%Y-%m-%d')
         end_date = datetime.strptime(form_data['end_date'], '%Y-%m-%d')
         total_days = (end_date - start_date).days + 1
         total_hours = total_days * form_data['daily_hours']
         
-        tasks = self._generate_tasks(form_data, total_days, start_date)
+        progress(0.0, "🎯 Matching your focus areas to topics...")
+        matcher = WeaknessMatcher(form_data['weaknesses'])
+        tasks = self._generate_tasks(form_data, total_days, start_date, matcher,
+                                     lambda fraction, message: progress(0.1 + fraction * 0.9, message))
+        progress(1.0, "✅ Study plan ready")
         
         return {
             'id': str(uuid.uuid4()),
@@ -203,31 +321,35 @@ class StudyPlanGenerator:
             'created_at': datetime.now().isoformat()
         }
     
-    def _generate_tasks(self, form_data: Dict[str, Any], total_days: int, start_date: datetime) -> List[Dict[str, Any]]:
+    def _generate_tasks(self, form_data: Dict[str, Any], total_days: int, start_date: datetime, matcher: WeaknessMatcher,
+                        progress: Callable[[float, str], None]) -> List[Dict[str, Any]]:
         if form_data['type'] == 'exam':
-            return self._generate_exam_tasks(form_data, total_days, start_date)
+            return self._generate_exam_tasks(form_data, total_days, start_date, matcher, progress)
         elif form_data['type'] == 'project':
-            return self._generate_project_tasks(form_data, total_days, start_date)
+            return self._generate_project_tasks(form_data, total_days, start_date, progress)
         else:  # subject
-            return self._generate_subject_tasks(form_data, total_days, start_date)
+            return self._generate_subject_tasks(form_data, total_days, start_date, matcher, progress)
     
-    def _generate_exam_tasks(self, form_data: Dict[str, Any], total_days: int, start_date: datetime) -> List[Dict[str, Any]]:
+    def _generate_exam_tasks(self, form_data: Dict[str, Any], total_days: int, start_date: datetime, matcher: WeaknessMatcher,
+                             progress: Callable[[float, str], None]) -> List[Dict[str, Any]]:
         tasks = []
         subject_topics = self._get_subject_topics(form_data['subject'])
-        weakness_topics = form_data['weaknesses']
+        steps = len(subject_topics[:3]) + len(subject_topics) + 1
         
         # Phase 1: Foundation (40% of time)
         foundation_days = int(total_days * 0.4)
         for i, topic in enumerate(subject_topics[:3]):
+            progress(len(tasks) / steps, f"📚 Planning {topic} fundamentals...")
             due_date = start_date + timedelta(days=int((foundation_days / 3) * (i + 1)))
+            is_weak = matcher.is_weak(topic)
             tasks.append({
                 'id': str(uuid.uuid4()),
                 'title': f'Master {topic} Fundamentals',
                 'description': f'Study core concepts and basic principles of {topic}',
                 'due_date': due_date.strftime('%Y-%m-%d'),
-                'estimated_hours': form_data['daily_hours'] * 3,
+                'estimated_hours': form_data['daily_hours'] * 3 * (WEAKNESS_HOURS_FACTOR if is_weak else 1),
                 'completed_hours': 0,
-                'priority': 'high' if topic in weakness_topics else 'medium',
+                'priority': 'high' if is_weak else 'medium',
                 'status': 'pending',
                 'category': 'Foundation'
             })
@@ -236,20 +358,23 @@ class StudyPlanGenerator:
         practice_start = foundation_days
         practice_days = int(total_days * 0.35)
         for i, topic in enumerate(subject_topics):
+            progress(len(tasks) / steps, f"✏️ Planning {topic} practice...")
             due_date = start_date + timedelta(days=practice_start + int((practice_days / len(subject_topics)) * (i + 1)))
+            is_weak = matcher.is_weak(topic)
             tasks.append({
                 'id': str(uuid.uuid4()),
                 'title': f'{topic} Practice Problems',
                 'description': f'Complete practice exercises and solve sample problems for {topic}',
                 'due_date': due_date.strftime('%Y-%m-%d'),
-                'estimated_hours': form_data['daily_hours'] * 2,
+                'estimated_hours': form_data['daily_hours'] * 2 * (WEAKNESS_HOURS_FACTOR if is_weak else 1),
                 'completed_hours': 0,
-                'priority': 'high' if topic in weakness_topics else 'medium',
+                'priority': 'high' if is_weak else 'medium',
                 'status': 'pending',
                 'category': 'Practice'
             })
         
         # Phase 3: Review (25% of time)
+        progress(len(tasks) / steps, "🔁 Planning review and mock exams...")
         review_start = foundation_days + practice_days
         review_days = total_days - review_start
         
@@ -279,14 +404,17 @@ class StudyPlanGenerator:
         
         return tasks
     
-    def _generate_project_tasks(self, form_data: Dict[str, Any], total_days: int, start_date: datetime) -> List[Dict[str, Any]]:
+    def _generate_project_tasks(self, form_data: Dict[str, Any], total_days: int, start_date: datetime,
+                                progress: Callable[[float, str], None]) -> List[Dict[str, Any]]:
         tasks = []
         phases = list(self.project_phases.keys())
         days_per_phase = total_days // len(phases)
+        steps = sum(len(activities) for activities in self.project_phases.values())
         
         for phase_index, phase in enumerate(phases):
             phase_activities = self.project_phases[phase]
             for activity_index, activity in enumerate(phase_activities):
+                progress(len(tasks) / steps, f"🛠️ Planning {phase} phase: {activity}...")
                 day_offset = (phase_index * days_per_phase) + int((days_per_phase / len(phase_activities)) * (activity_index + 1))
                 due_date = start_date + timedelta(days=day_offset)
                 
@@ -304,14 +432,17 @@ class StudyPlanGenerator:
         
         return tasks
     
-    def _generate_subject_tasks(self, form_data: Dict[str, Any], total_days: int, start_date: datetime) -> List[Dict[str, Any]]:
+    def _generate_subject_tasks(self, form_data: Dict[str, Any], total_days: int, start_date: datetime, matcher: WeaknessMatcher,
+                                progress: Callable[[float, str], None]) -> List[Dict[str, Any]]:
         tasks = []
         subject_topics = self._get_subject_topics(form_data['subject'])
         weekly_topics = max(1, len(subject_topics) // max(1, total_days // 7))
         
         for i, topic in enumerate(subject_topics):
+            progress(i / len(subject_topics), f"📚 Planning {topic}...")
             week_number = i // weekly_topics
             due_date = start_date + timedelta(days=(week_number + 1) * 7)
+            is_weak = matcher.is_weak(topic)
             
             # Study task
             tasks.append({
@@ -319,9 +450,9 @@ class StudyPlanGenerator:
                 'title': f'Study {topic}',
                 'description': f'Learn and understand {topic} concepts',
                 'due_date': due_date.strftime('%Y-%m-%d'),
-                'estimated_hours': form_data['daily_hours'] * 3,
+                'estimated_hours': form_data['daily_hours'] * 3 * (WEAKNESS_HOURS_FACTOR if is_weak else 1),
                 'completed_hours': 0,
-                'priority': 'high' if topic in form_data['weaknesses'] else 'medium',
+                'priority': 'high' if is_weak else 'medium',
                 'status': 'pending',
                 'category': 'Learning'
             })
@@ -333,9 +464,9 @@ class StudyPlanGenerator:
                 'title': f'Practice {topic}',
                 'description': f'Apply {topic} knowledge through exercises',
                 'due_date': practice_date.strftime('%Y-%m-%d'),
-                'estimated_hours': form_data['daily_hours'] * 2,
+                'estimated_hours': form_data['daily_hours'] * 2 * (WEAKNESS_HOURS_FACTOR if is_weak else 1),
                 'completed_hours': 0,
-                'priority': 'high' if topic in form_data['weaknesses'] else 'medium',
+                'priority': 'high' if is_weak else 'medium',
                 'status': 'pending',
                 'category': 'Practice'
             })
@@ -357,6 +488,692 @@ class StudyPlanGenerator:
         else:
             return ['Introduction', 'Core Concepts', 'Advanced Topics', 'Applications', 'Review']
 
+URGENCY_SWEEP_SECONDS = 60
+REMINDERS_PER_PLAN = 20
+DUE_SOON_DAYS = 2
+DUE_THIS_WEEK_DAYS = 7
+
+def days_until_due(task: Dict[str, Any], today: Optional[date] = None) -> int:
+    today = today or date.today()
+    return (datetime.strptime(task['due_date'], '%Y-%m-%d').date() - today).days
+
+def urgency_for(days: int) -> str:
+    if days < 0:
+        return 'overdue'
+    elif days <= DUE_SOON_DAYS:
+        return 'due_soon'
+    elif days <= DUE_THIS_WEEK_DAYS:
+        return 'this_week'
+    else:
+        return 'later'
+
+# Keeps each pending task's 'urgency' flag current from a background thread.
+# Tasks sit in a min-heap keyed on the date of their next urgency transition,
+# so a sweep only touches tasks whose state actually changes that day.
+# Plans are tracked per owning session; a session whose plan store is garbage
+# collected is queued for release and its plans are dropped on the next sweep.
+class UrgencyMonitor:
+    def __init__(self, interval: int = URGENCY_SWEEP_SECONDS):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.due_index = []
+        self.events = {}
+        self.owners = {}
+        self._released = deque()
+        self._indexed = {}
+        self._counter = itertools.count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='studbud-urgency', daemon=True)
+        self._thread.start()
+
+    def watch(self, owner: str, store: Dict[str, Any]):
+        with self.lock:
+            if owner in self.owners:
+                return
+            self.owners[owner] = set()
+        # The finalizer may run inside a locked section, so it only queues
+        weakref.finalize(store, self._released.append, owner)
+
+    def track_plan(self, plan: Dict[str, Any], owner: Optional[str] = None):
+        today = date.today()
+        with self.lock:
+            self.owners.setdefault(owner, set()).add(plan['id'])
+            for task in plan['tasks']:
+                self._index_task(plan['id'], task, today)
+
+    def track_task(self, plan: Dict[str, Any], task: Dict[str, Any]):
+        with self.lock:
+            self._index_task(plan['id'], task, date.today())
+
+    def untrack_plan(self, plan: Dict[str, Any]):
+        with self.lock:
+            for plan_ids in self.owners.values():
+                plan_ids.discard(plan['id'])
+            self._drop_plans({plan['id']})
+
+    def sweep(self, today: Optional[date] = None):
+        today = today or date.today()
+        with self.lock:
+            released = set()
+            while self._released:
+                released |= self.owners.pop(self._released.popleft(), set())
+            if released:
+                self._drop_plans(released)
+
+            while self.due_index and self.due_index[0][0] <= today:
+                _, seq, plan_id, task = heapq.heappop(self.due_index)
+                # Entries superseded by a re-index or an untrack are dropped lazily
+                if self._indexed.get(task['id']) != seq:
+                    continue
+                del self._indexed[task['id']]
+                self._index_task(plan_id, task, today)
+
+    def recent_events(self, plan_ids, limit: int = 5) -> List[Dict[str, Any]]:
+        with self.lock:
+            events = [e for plan_id in plan_ids for e in self.events.get(plan_id, ())]
+        return sorted(events, key=lambda e: e['at'], reverse=True)[:limit]
+
+    def _drop_plans(self, plan_ids):
+        kept = []
+        for entry in self.due_index:
+            if entry[2] in plan_ids:
+                if self._indexed.get(entry[3]['id']) == entry[1]:
+                    del self._indexed[entry[3]['id']]
+            else:
+                kept.append(entry)
+        heapq.heapify(kept)
+        self.due_index = kept
+        for plan_id in plan_ids:
+            self.events.pop(plan_id, None)
+
+    def _index_task(self, plan_id: str, task: Dict[str, Any], today: date):
+        if task['status'] != 'pending':
+            self._indexed.pop(task['id'], None)
+            return
+
+        due = datetime.strptime(task['due_date'], '%Y-%m-%d').date()
+        previous = task.get('urgency')
+        task['urgency'] = urgency_for((due - today).days)
+
+        if task['urgency'] != previous and task['urgency'] in ('due_soon', 'overdue'):
+            feed = self.events.get(plan_id)
+            if feed is None:
+                feed = self.events[plan_id] = deque(maxlen=REMINDERS_PER_PLAN)
+            feed.append({
+                'plan_id': plan_id,
+                'task_id': task['id'],
+                'title': task['title'],
+                'urgency': task['urgency'],
+                'due_date': task['due_date'],
+                'at': datetime.now().isoformat()
+            })
+
+        transitions = [
+            due - timedelta(days=DUE_THIS_WEEK_DAYS),
+            due - timedelta(days=DUE_SOON_DAYS),
+            due + timedelta(days=1)
+        ]
+        next_change = next((d for d in transitions if d > today), None)
+        if next_change is None:
+            self._indexed.pop(task['id'], None)
+            return
+
+        seq = next(self._counter)
+        self._indexed[task['id']] = seq
+        heapq.heappush(self.due_index, (next_change, seq, plan_id, task))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sweep()
+
+@st.cache_resource
+def get_urgency_monitor() -> UrgencyMonitor:
+    return UrgencyMonitor()
+
+ADMIN_MODE = os.environ.get('STUDBUD_ADMIN_MODE') == '1'
+# Shipping plans to worker processes costs more than reducing them in-process,
+# so the analytics pool is opt-in for deployments with heavier aggregation
+ANALYTICS_WORKERS = int(os.environ.get('STUDBUD_ANALYTICS_WORKERS', '1'))
+
+# Process-wide view of every live session's plan store for cohort analytics.
+# Stores are held weakly so ended sessions drop out, and any plan change or
+# ended session bumps a single data version that the analytics cache is keyed
+# on. Per-plan partial aggregates are kept here too and only recomputed for
+# plans that changed.
+class PlanRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stores = weakref.WeakValueDictionary()
+        self._versions = itertools.count(1)
+        self.version = 0
+        self.analytics_lock = threading.Lock()
+        self.partials = {}
+
+    def register(self, session_key: str, store: PlanStore):
+        with self.lock:
+            if self.stores.get(session_key) is store:
+                return
+            self.stores[session_key] = store
+        weakref.finalize(store, self.bump)
+        self.bump()
+
+    def bump(self):
+        # Lock-free (next() on a count is atomic) since finalizers call it from any point
+        self.version = next(self._versions)
+
+    def snapshot(self):
+        with self.lock:
+            stores = list(self.stores.items())
+        plans = [((session_key, plan_id), store.versions.get(plan_id, 0), plan)
+                 for session_key, store in stores for plan_id, plan in list(store.items())]
+        # Students are sessions with at least one plan, not every open browser tab
+        return len({key[0] for key, _, _ in plans}), plans
+
+@st.cache_resource
+def get_plan_registry() -> PlanRegistry:
+    return PlanRegistry()
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def cohort_stats(_registry: PlanRegistry, version: int, today: str) -> Dict[str, Any]:
+    students, plans = _registry.snapshot()
+    started = time.perf_counter()
+    with _registry.analytics_lock:
+        stats = compute_cohort_stats(plans, today, workers=ANALYTICS_WORKERS, cache=_registry.partials)
+    stats['students'] = students
+    stats['version'] = version
+    stats['elapsed_ms'] = (time.perf_counter() - started) * 1000
+    return stats
+
+get_plan_registry().register(st.session_state.session_key, st.session_state.study_plans)
+get_urgency_monitor().watch(st.session_state.session_key, st.session_state.study_plans)
+
+SEARCH_FIELD_WEIGHTS = {
+    'title': 3.0,
+    'subject': 2.0,
+    'weaknesses': 2.0,
+    'category': 1.0,
+    'description': 1.0
+}
+SEARCH_PREFIX_BOOST = 0.5
+SEARCH_MIN_PREFIX = 3
+SEARCH_MAX_CANDIDATES = 5000
+
+# Incrementally maintained inverted index over plans and their tasks.
+# The vocabulary is kept sorted so prefix queries are a bisect plus a short scan.
+# A query is driven by its most selective term, scanning at most
+# SEARCH_MAX_CANDIDATES postings, and the other terms only probe those
+# candidates, so query cost does not grow with the size of the index.
+class SearchIndex:
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = []
+        self.doc_tokens = {}
+        self.docs = {}
+
+    def add_plan(self, plan: Dict[str, Any]):
+        self._add(('plan', plan['id'], None), {
+            'title': plan['title'],
+            'subject': plan['subject'],
+            'weaknesses': ' '.join(plan['weaknesses'])
+        }, {
+            'kind': 'plan',
+            'plan_id': plan['id'],
+            'title': plan['title'],
+            'context': plan['subject']
+        })
+
+        for task in plan['tasks']:
+            self._add(('task', plan['id'], task['id']), {
+                'title': task['title'],
+                'description': task['description'],
+                'category': task['category']
+            }, {
+                'kind': 'task',
+                'plan_id': plan['id'],
+                'title': task['title'],
+                'context': f"{task['category']} · {plan['title']}"
+            })
+
+    def remove_plan(self, plan: Dict[str, Any]):
+        self._remove(('plan', plan['id'], None))
+        for task in plan['tasks']:
+            self._remove(('task', plan['id'], task['id']))
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        terms = [self._expand(term) for term in set(tokenize(query))]
+        if not terms or not all(terms):
+            return []
+
+        # Every term must match (as a whole token or a prefix of one)
+        terms.sort(key=lambda expansions: sum(len(self.postings[token]) for token, _ in expansions))
+        scores = {}
+        matches = ((doc_key, weight * boost) for token, boost in terms[0] for doc_key, weight in self.postings[token].items())
+        for doc_key, score in itertools.islice(matches, SEARCH_MAX_CANDIDATES):
+            scores[doc_key] = max(scores.get(doc_key, 0), score)
+
+        for expansions in terms[1:]:
+            probed = {}
+            for doc_key, score in scores.items():
+                best = max(self.postings[token].get(doc_key, 0) * boost for token, boost in expansions)
+                if best:
+                    probed[doc_key] = score + best
+            scores = probed
+            if not scores:
+                return []
+
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [dict(self.docs[doc_key], score=score) for doc_key, score in ranked]
+
+    def _expand(self, term: str):
+        # Whole-token match first; terms too short to be selective get no prefix expansion
+        expansions = [(term, 1.0)] if term in self.postings else []
+        if len(term) >= SEARCH_MIN_PREFIX:
+            i = bisect_left(self.vocabulary, term)
+            while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+                if self.vocabulary[i] != term:
+                    expansions.append((self.vocabulary[i], SEARCH_PREFIX_BOOST))
+                i += 1
+        return expansions
+
+    def _add(self, doc_key, fields: Dict[str, str], meta: Dict[str, Any]):
+        self._remove(doc_key)
+
+        weights = {}
+        for field, text in fields.items():
+            for token in tokenize(text):
+                weights[token] = weights.get(token, 0) + SEARCH_FIELD_WEIGHTS[field]
+
+        for token, weight in weights.items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                insort(self.vocabulary, token)
+            self.postings[token][doc_key] = weight
+
+        self.doc_tokens[doc_key] = list(weights)
+        self.docs[doc_key] = meta
+
+    def _remove(self, doc_key):
+        for token in self.doc_tokens.pop(doc_key, []):
+            postings = self.postings[token]
+            del postings[doc_key]
+            if not postings:
+                del self.postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+        self.docs.pop(doc_key, None)
+
+if 'search_index' not in st.session_state:
+    st.session_state.search_index = SearchIndex()
+
+STUDY_LOG_INITIAL_CAPACITY = 1024
+STUDY_CHART_MAX_POINTS = 90
+
+# Append-only log of study sessions stored column-wise in numpy arrays.
+# Per-plan daily hours and per-task totals are reduced from the columns with
+# bincount and cached until the next session is appended.
+class StudyLog:
+    def __init__(self, capacity: int = STUDY_LOG_INITIAL_CAPACITY):
+        self.size = 0
+        self.day = np.empty(capacity, dtype=np.int32)
+        self.plan = np.empty(capacity, dtype=np.int32)
+        self.task = np.empty(capacity, dtype=np.int32)
+        self.hours = np.empty(capacity, dtype=np.float32)
+        self.plan_ids = []
+        self.task_ids = []
+        self._plan_codes = {}
+        self._task_codes = {}
+        self._daily = {}
+        self._task_totals = None
+
+    def log(self, plan_id: str, task_id: str, hours: float, day: Optional[date] = None):
+        if self.size == len(self.day):
+            self._grow()
+
+        plan_code = self._code(plan_id, self.plan_ids, self._plan_codes)
+        self.day[self.size] = (day or date.today()).toordinal()
+        self.plan[self.size] = plan_code
+        self.task[self.size] = self._code(task_id, self.task_ids, self._task_codes)
+        self.hours[self.size] = hours
+        self.size += 1
+
+        self._daily.pop(plan_code, None)
+        self._task_totals = None
+
+    def task_hours(self, task_id: str) -> float:
+        code = self._task_codes.get(task_id)
+        if code is None:
+            return 0.0
+        if self._task_totals is None:
+            self._task_totals = np.bincount(self.task[:self.size], weights=self.hours[:self.size], minlength=len(self.task_ids))
+        return float(self._task_totals[code])
+
+    def daily_series(self, plan_id: str, max_points: int = STUDY_CHART_MAX_POINTS) -> pd.DataFrame:
+        first, hours = self._daily_hours(plan_id)
+        if not len(hours):
+            return pd.DataFrame(columns=['date', 'hours'])
+
+        # Downsample long histories by summing fixed-size buckets of days
+        bucket = max(1, -(-len(hours) // max_points))
+        if bucket > 1:
+            hours = np.pad(hours, (0, -len(hours) % bucket)).reshape(-1, bucket).sum(axis=1)
+
+        return pd.DataFrame({
+            'date': [date.fromordinal(first + i * bucket) for i in range(len(hours))],
+            'hours': hours
+        })
+
+    def weekly_series(self, plan_id: str) -> pd.DataFrame:
+        first, hours = self._daily_hours(plan_id)
+        if not len(hours):
+            return pd.DataFrame(columns=['week', 'hours'])
+
+        # Ordinal 1 is a Monday, so (ordinal + 6) % 7 is the weekday
+        first_week = first - (first + 6) % 7
+        weekly = np.bincount((first - first_week + np.arange(len(hours))) // 7, weights=hours)
+        return pd.DataFrame({
+            'week': [date.fromordinal(first_week + 7 * i) for i in range(len(weekly))],
+            'hours': weekly
+        })
+
+    def week_hours(self, plan_id: str, day: Optional[date] = None) -> float:
+        first, hours = self._daily_hours(plan_id)
+        day = day or date.today()
+        start = day.toordinal() - day.weekday() - first
+        return float(hours[max(0, start):max(0, start + 7)].sum())
+
+    def rows(self) -> List[List[Any]]:
+        return [[date.fromordinal(int(day)).isoformat(), self.plan_ids[plan], self.task_ids[task], float(hours)]
+                for day, plan, task, hours in zip(self.day[:self.size], self.plan[:self.size],
+                                                  self.task[:self.size], self.hours[:self.size])]
+
+    def _daily_hours(self, plan_id: str):
+        code = self._plan_codes.get(plan_id)
+        if code is None:
+            return 0, np.zeros(0)
+        if code not in self._daily:
+            rows = self.plan[:self.size] == code
+            days = self.day[:self.size][rows]
+            first = int(days.min())
+            self._daily[code] = (first, np.bincount(days - first, weights=self.hours[:self.size][rows]))
+        return self._daily[code]
+
+    def _grow(self):
+        capacity = len(self.day) * 2
+        for column in ('day', 'plan', 'task', 'hours'):
+            grown = np.empty(capacity, dtype=getattr(self, column).dtype)
+            grown[:self.size] = getattr(self, column)[:self.size]
+            setattr(self, column, grown)
+
+    def _code(self, value: str, values: List[str], codes: Dict[str, int]) -> int:
+        if value not in codes:
+            codes[value] = len(values)
+            values.append(value)
+        return codes[value]
+
+if 'study_log' not in st.session_state:
+    st.session_state.study_log = StudyLog()
+
+PLAN_GENERATION_WORKERS = 4
+AI_PROCESSING_SECONDS = 2
+AI_PROCESSING_TICKS = 20
+PLAN_JOB_POLL_SECONDS = 0.5
+
+# Handle for a plan being generated on the worker pool. The worker only writes
+# progress/message; the script thread collects the finished plan into the store.
+class PlanJob:
+    def __init__(self, form_data: Dict[str, Any]):
+        self.id = str(uuid.uuid4())
+        self.title = form_data['title']
+        self.form_data = form_data
+        self.progress = 0.0
+        self.message = "⏳ Queued"
+        self.future = None
+
+    def report(self, progress: float, message: str):
+        self.progress = progress
+        self.message = message
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+def run_plan_job(job: PlanJob) -> Dict[str, Any]:
+    # Simulate AI processing, advancing the bar through the first half
+    for tick in range(AI_PROCESSING_TICKS):
+        job.report(0.5 * tick / AI_PROCESSING_TICKS, "🤖 AI is analyzing your requirements...")
+        time.sleep(AI_PROCESSING_SECONDS / AI_PROCESSING_TICKS)
+
+    # Generation itself covers the remaining progress range
+    return StudyPlanGenerator().generate_study_plan(
+        job.form_data, progress=lambda fraction, message: job.report(0.5 + fraction * 0.5, message)
+    )
+
+@st.cache_resource
+def get_plan_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=PLAN_GENERATION_WORKERS, thread_name_prefix='studbud-plans')
+
+def submit_plan_job(form_data: Dict[str, Any]) -> PlanJob:
+    job = PlanJob(form_data)
+    job.future = get_plan_executor().submit(run_plan_job, job)
+    st.session_state.plan_jobs[job.id] = job
+    return job
+
+def collect_plan_jobs():
+    for job_id, job in list(st.session_state.plan_jobs.items()):
+        if not job.done():
+            continue
+        del st.session_state.plan_jobs[job_id]
+        try:
+            new_plan = job.future.result()
+        except Exception as e:
+            st.session_state.finished_jobs.append({'title': job.title, 'plan_id': None, 'error': str(e)})
+            continue
+        add_plan(new_plan)
+        record_action('create_plan', form_data=job.form_data, plan_id=new_plan['id'], task_ids=[t['id'] for t in new_plan['tasks']])
+        st.session_state.finished_jobs.append({'title': job.title, 'plan_id': new_plan['id'], 'error': None})
+        st.balloons()
+
+TRACE_DIR = os.environ.get('STUDBUD_TRACE_DIR', 'traces')
+
+# Opt-in recorder of generator inputs and UI actions as JSON lines, replayed
+# headlessly by replay_trace.py to reproduce a user's workload offline. The file
+# is opened per event, so a session that ends mid-recording leaves nothing open.
+class TraceRecorder:
+    def __init__(self, directory: str = TRACE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"trace-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}.jsonl")
+        self.started = time.perf_counter()
+
+    def record(self, action: str, **fields):
+        event = {'t': round(time.perf_counter() - self.started, 3), 'action': action, **fields}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event, default=str) + '\n')
+
+def record_action(action: str, **fields):
+    if st.session_state.trace_recorder:
+        st.session_state.trace_recorder.record(action, **fields)
+
+def start_trace():
+    st.session_state.trace_recorder = TraceRecorder()
+    # Start from the session's current plans and study log so the replay sees the same state
+    record_action('snapshot', plans=list(st.session_state.study_plans.values()), study_log=st.session_state.study_log.rows())
+
+def stop_trace():
+    st.session_state.trace_recorder = None
+
+# Plans live only in st.session_state.study_plans (keyed by id); everything else
+# refers to them by id and resolves through the store. Each mutation bumps the
+# plan's version so derived data can be cached on (id, version).
+def get_plan(plan_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    return st.session_state.study_plans.get(plan_id)
+
+def add_plan(plan: Dict[str, Any]):
+    st.session_state.study_plans[plan['id']] = plan
+    st.session_state.plan_versions[plan['id']] = 0
+    st.session_state.search_index.add_plan(plan)
+    get_urgency_monitor().track_plan(plan, st.session_state.session_key)
+    get_plan_registry().bump()
+
+def delete_plan(plan_id: str):
+    plan = st.session_state.study_plans.pop(plan_id)
+    st.session_state.plan_versions.pop(plan_id, None)
+    st.session_state.plan_summaries.pop(plan_id, None)
+    st.session_state.search_index.remove_plan(plan)
+    get_urgency_monitor().untrack_plan(plan)
+    get_plan_registry().bump()
+    if st.session_state.selected_plan_id == plan_id:
+        st.session_state.selected_plan_id = None
+
+def touch_plan(plan_id: str):
+    st.session_state.plan_versions[plan_id] += 1
+    get_plan_registry().bump()
+
+def select_plan(plan_id: Optional[str], view: str = 'plan_detail'):
+    st.session_state.selected_plan_id = plan_id
+    st.session_state.current_view = view
+    record_action('view', view=view, plan_id=plan_id)
+
+# Plans and study sessions handed over by a trace replay (or any other importer)
+# are added on the next run so they go through the same bookkeeping as new ones
+def import_plans():
+    while st.session_state.plans_to_import:
+        plan = st.session_state.plans_to_import.pop(0)
+        if plan['id'] not in st.session_state.study_plans:
+            add_plan(plan)
+    while st.session_state.study_log_to_import:
+        day, plan_id, task_id, hours = st.session_state.study_log_to_import.pop(0)
+        st.session_state.study_log.log(plan_id, task_id, hours, date.fromisoformat(day))
+
+def plan_summary(plan: Dict[str, Any]) -> Dict[str, Any]:
+    version = st.session_state.plan_versions[plan['id']]
+    cached = st.session_state.plan_summaries.get(plan['id'])
+    if cached and cached[0] == version:
+        return cached[1]
+
+    tasks_by_category = {}
+    for task in plan['tasks']:
+        tasks_by_category.setdefault(task['category'], []).append(task)
+
+    summary = {
+        'progress': (plan['completed_hours'] / plan['total_hours'] * 100) if plan['total_hours'] > 0 else 0,
+        'completed_tasks': len([t for t in plan['tasks'] if t['status'] == 'completed']),
+        'total_tasks': len(plan['tasks']),
+        'tasks_by_category': tasks_by_category
+    }
+    st.session_state.plan_summaries[plan['id']] = (version, summary)
+    return summary
+
+EXPORT_CHUNK_LINES = 500
+EXPORT_CSV_FIELDS = ['plan', 'subject', 'task', 'category', 'due_date', 'priority', 'status', 'estimated_hours', 'completed_hours', 'description']
+ICS_PRIORITIES = {'high': 1, 'medium': 5, 'low': 9}
+
+# Calendar/CSV exports are generator pipelines: plans -> rows/lines -> chunks.
+# Nothing holds more than one chunk, so write_export() can stream to a file or
+# socket in constant memory. Streamlit's download button needs the whole
+# document, so the UI builds one on request and keeps only that one.
+def ics_escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+def ics_fold(line: str) -> str:
+    # RFC 5545 lines are at most 75 octets; continuation lines start with a space
+    if len(line.encode('utf-8')) <= 75:
+        return line
+    if line.isascii():
+        return '\r\n '.join([line[:75]] + [line[i:i + 74] for i in range(75, len(line), 74)])
+    parts, current, size, limit = [], [], 0, 75
+    for char in line:
+        width = len(char.encode('utf-8'))
+        if size + width > limit:
+            parts.append(''.join(current))
+            current, size, limit = [], 0, 74
+        current.append(char)
+        size += width
+    parts.append(''.join(current))
+    return '\r\n '.join(parts)
+
+def iter_ics_lines(plans):
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    yield 'BEGIN:VCALENDAR'
+    yield 'VERSION:2.0'
+    yield 'PRODID:-//Studbud//AI Study Planner//EN'
+    yield 'CALSCALE:GREGORIAN'
+    for plan in plans:
+        for task in plan['tasks']:
+            due = datetime.strptime(task['due_date'], '%Y-%m-%d')
+            yield 'BEGIN:VEVENT'
+            yield f"UID:{task['id']}@studbud"
+            yield f'DTSTAMP:{stamp}'
+            yield f"DTSTART;VALUE=DATE:{due.strftime('%Y%m%d')}"
+            yield f"DTEND;VALUE=DATE:{(due + timedelta(days=1)).strftime('%Y%m%d')}"
+            yield ics_fold(f"SUMMARY:{ics_escape(task['title'])} ({ics_escape(plan['title'])})")
+            yield ics_fold(f"DESCRIPTION:{ics_escape(task['description'])}\\n{task['estimated_hours']}h - {task['status']}")
+            yield ics_fold(f"CATEGORIES:{ics_escape(task['category'])},{ics_escape(plan['subject'])}")
+            yield f"PRIORITY:{ICS_PRIORITIES.get(task['priority'], 5)}"
+            yield 'END:VEVENT'
+    yield 'END:VCALENDAR'
+
+def iter_csv_lines(plans):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='')
+
+    def line(row):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        return buffer.getvalue()
+
+    yield line(EXPORT_CSV_FIELDS)
+    for plan in plans:
+        for task in plan['tasks']:
+            yield line([plan['title'], plan['subject'], task['title'], task['category'], task['due_date'], task['priority'],
+                        task['status'], task['estimated_hours'], task['completed_hours'], task['description']])
+
+def iter_export_chunks(plans, export_format: str, chunk_lines: int = EXPORT_CHUNK_LINES):
+    lines = iter_ics_lines(plans) if export_format == 'ics' else iter_csv_lines(plans)
+    newline = '\r\n'
+    while True:
+        chunk = list(itertools.islice(lines, chunk_lines))
+        if not chunk:
+            return
+        yield (newline.join(chunk) + newline).encode('utf-8')
+
+def write_export(fp, plans, export_format: str):
+    for chunk in iter_export_chunks(plans, export_format):
+        fp.write(chunk)
+
+def export_key(plans: List[Dict[str, Any]], export_format: str):
+    return (export_format, tuple((p['id'], st.session_state.plan_versions[p['id']]) for p in plans))
+
+def export_data(plans: List[Dict[str, Any]], export_format: str) -> bytes:
+    buffer = io.BytesIO()
+    write_export(buffer, plans, export_format)
+    return buffer.getvalue()
+
+def render_export_button(plans: List[Dict[str, Any]], export_format: str, label: str, file_name: str, mime: str, key: str):
+    # Exports are only built on request, never as part of rendering the page. The
+    # session holds at most the one document offered for download, until it is
+    # downloaded, another export is prepared or its plans change.
+    pending = st.session_state.pending_export
+    slot = (key, export_key(plans, export_format))
+    if pending and pending['slot'] != slot and pending['slot'][:1] + pending['slot'][1][:1] == (key, export_format):
+        # Its plans changed since it was prepared
+        pending = st.session_state.pending_export = None
+    if pending and pending['slot'] == slot:
+        data = pending['data']
+    elif st.button(f"📦 Prepare {label}", key=f"prepare_{export_format}_{key}", use_container_width=True):
+        data = export_data(plans, export_format)
+        st.session_state.pending_export = {'slot': slot, 'data': data}
+    else:
+        return
+    if st.download_button(f"⬇️ Download {label}", data, file_name=file_name, mime=mime,
+                          key=f"export_{export_format}_{key}", use_container_width=True):
+        st.session_state.pending_export = None
+
+def render_export_buttons(plans: List[Dict[str, Any]], file_stem: str, key: str):
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        render_export_button(plans, 'ics', "Calendar (.ics)", f"{file_stem}.ics", 'text/calendar', key)
+    with col2:
+        render_export_button(plans, 'csv', "Tasks (.csv)", f"{file_stem}.csv", 'text/csv', key)
+
 def render_header():
     st.markdown('<h1 class="header-title">🧠 Studbud</h1>', unsafe_allow_html=True)
     st.markdown('<p class="header-subtitle">AI-Powered Study Planner for Academic Excellence</p>', unsafe_allow_html=True)
@@ -366,30 +1183,43 @@ def render_sidebar():
         st.markdown("### 📚 Navigation")
         
         if st.button("🏠 Dashboard", use_container_width=True):
-            st.session_state.current_view = 'dashboard'
-            st.session_state.selected_plan = None
+            select_plan(None, 'dashboard')
             st.rerun()
         
         if st.button("📋 Study Plans", use_container_width=True):
-            st.session_state.current_view = 'plans'
-            st.session_state.selected_plan = None
+            select_plan(None, 'plans')
             st.rerun()
         
         if st.button("➕ Create Plan", use_container_width=True):
-            st.session_state.current_view = 'create'
-            st.session_state.selected_plan = None
+            select_plan(None, 'create')
+            st.rerun()
+        
+        if ADMIN_MODE and st.button("🏫 Cohort Analytics", use_container_width=True):
+            select_plan(None, 'cohort')
             st.rerun()
         
         st.markdown("---")
         st.markdown("### 📊 Quick Stats")
         
-        active_plans = len([p for p in st.session_state.study_plans if p['status'] == 'active'])
-        completed_plans = len([p for p in st.session_state.study_plans if p['status'] == 'completed'])
-        total_hours = sum(p['completed_hours'] for p in st.session_state.study_plans)
+        plans = st.session_state.study_plans.values()
+        active_plans = len([p for p in plans if p['status'] == 'active'])
+        completed_plans = len([p for p in plans if p['status'] == 'completed'])
+        total_hours = sum(p['completed_hours'] for p in plans)
         
         st.metric("Active Plans", active_plans)
         st.metric("Completed Plans", completed_plans)
         st.metric("Study Hours", f"{total_hours:.1f}")
+        
+        st.markdown("---")
+        st.markdown("### 🛠️ Diagnostics")
+        
+        recording = st.checkbox("🎥 Record performance trace", value=st.session_state.trace_recorder is not None)
+        if recording and not st.session_state.trace_recorder:
+            start_trace()
+        elif not recording and st.session_state.trace_recorder:
+            stop_trace()
+        if st.session_state.trace_recorder:
+            st.caption(f"Recording to `{st.session_state.trace_recorder.path}`")
 
 def render_dashboard():
     st.markdown("## 🏠 Dashboard")
@@ -405,16 +1235,17 @@ def render_dashboard():
         """, unsafe_allow_html=True)
         
         if st.button("🚀 Create Your First Study Plan", use_container_width=True):
-            st.session_state.current_view = 'create'
+            select_plan(None, 'create')
             st.rerun()
         return
     
     # Stats cards
     col1, col2, col3, col4 = st.columns(4)
     
-    active_plans = [p for p in st.session_state.study_plans if p['status'] == 'active']
-    completed_plans = [p for p in st.session_state.study_plans if p['status'] == 'completed']
-    total_hours = sum(p['completed_hours'] for p in st.session_state.study_plans)
+    plans = st.session_state.study_plans.values()
+    active_plans = [p for p in plans if p['status'] == 'active']
+    completed_plans = [p for p in plans if p['status'] == 'completed']
+    total_hours = sum(p['completed_hours'] for p in plans)
     
     # Get upcoming tasks
     upcoming_tasks = []
@@ -462,9 +1293,10 @@ def render_dashboard():
         st.markdown("### 📈 Active Study Plans")
         
         for plan in active_plans:
-            progress = (plan['completed_hours'] / plan['total_hours'] * 100) if plan['total_hours'] > 0 else 0
-            completed_tasks = len([t for t in plan['tasks'] if t['status'] == 'completed'])
-            total_tasks = len(plan['tasks'])
+            summary = plan_summary(plan)
+            progress = summary['progress']
+            completed_tasks = summary['completed_tasks']
+            total_tasks = summary['total_tasks']
             
             with st.container():
                 st.markdown(f"""
@@ -497,8 +1329,7 @@ def render_dashboard():
                 """, unsafe_allow_html=True)
                 
                 if st.button(f"View Details - {plan['title']}", key=f"view_{plan['id']}"):
-                    st.session_state.selected_plan = plan
-                    st.session_state.current_view = 'plan_detail'
+                    select_plan(plan['id'])
                     st.rerun()
     
     # Upcoming Tasks
@@ -506,11 +1337,10 @@ def render_dashboard():
         st.markdown("### 📅 Upcoming Tasks")
         
         for task in upcoming_tasks:
-            due_date = datetime.strptime(task['due_date'], '%Y-%m-%d')
-            days_until_due = (due_date - datetime.now()).days
+            days_left = days_until_due(task)
             
-            urgency_color = "#f44336" if days_until_due <= 2 else "#ff9800" if days_until_due <= 7 else "#4caf50"
-            urgency_text = "Due Today" if days_until_due == 0 else f"Due in {days_until_due} days" if days_until_due > 0 else f"{abs(days_until_due)} days overdue"
+            urgency_color = "#f44336" if task['urgency'] in ('overdue', 'due_soon') else "#ff9800" if task['urgency'] == 'this_week' else "#4caf50"
+            urgency_text = "Due Today" if days_left == 0 else f"Due in {days_left} days" if days_left > 0 else f"{abs(days_left)} days overdue"
             
             st.markdown(f"""
             <div class="task-card">
@@ -529,11 +1359,25 @@ def render_dashboard():
             </div>
             """, unsafe_allow_html=True)
 
+    # Reminders raised by the background urgency sweep
+    reminders = get_urgency_monitor().recent_events(p['id'] for p in active_plans)
+    if reminders:
+        st.markdown("### 🔔 Reminders")
+
+        for event in reminders:
+            reminder_color = "#f44336" if event['urgency'] == 'overdue' else "#ff9800"
+            reminder_text = "is overdue" if event['urgency'] == 'overdue' else "is due soon"
+
+            st.markdown(f"""
+            <div class="task-card" style="border-left-color: {reminder_color};">
+                <span style="color: white;">{event['title']}</span>
+                <span style="color: {reminder_color}; font-size: 0.9rem;"> {reminder_text} ({event['due_date']})</span>
+            </div>
+            """, unsafe_allow_html=True)
+
 def render_create_plan():
     st.markdown("## ➕ Create AI-Powered Study Plan")
     
-    generator = StudyPlanGenerator()
-    
     with st.form("create_plan_form"):
         st.markdown("### 📋 Basic Information")
         
@@ -579,32 +1423,47 @@ def render_create_plan():
                 st.error("End date must be after start date")
                 return
             
-            with st.spinner("🤖 AI is analyzing your requirements and generating your personalized study plan..."):
-                import time
-                time.sleep(2)  # Simulate AI processing
-                
-                form_data = {
-                    'title': title,
-                    'type': plan_type,
-                    'subject': subject,
-                    'start_date': start_date.strftime('%Y-%m-%d'),
-                    'end_date': end_date.strftime('%Y-%m-%d'),
-                    'daily_hours': daily_hours,
-                    'weaknesses': weaknesses,
-                    'learning_methods': learning_methods,
-                    'goals': goals
-                }
-                
-                new_plan = generator.generate_study_plan(form_data)
-                st.session_state.study_plans.append(new_plan)
-                
-                st.success("🎉 Your AI-powered study plan has been created successfully!")
-                st.balloons()
-                
-                if st.button("View Your New Study Plan"):
-                    st.session_state.selected_plan = new_plan
-                    st.session_state.current_view = 'plan_detail'
-                    st.rerun()
+            form_data = {
+                'title': title,
+                'type': plan_type,
+                'subject': subject,
+                'start_date': start_date.strftime('%Y-%m-%d'),
+                'end_date': end_date.strftime('%Y-%m-%d'),
+                'daily_hours': daily_hours,
+                'weaknesses': weaknesses,
+                'learning_methods': learning_methods,
+                'goals': goals
+            }
+            
+            submit_plan_job(form_data)
+            st.info("🤖 Your study plan is being generated. Feel free to keep browsing - we'll let you know when it's ready.")
+
+def render_plan_jobs():
+    for job in st.session_state.plan_jobs.values():
+        st.progress(job.progress, text=f"**{job.title}** - {job.message}")
+    
+    if st.session_state.plan_jobs and st.button("🔄 Check Progress", key="refresh_plan_jobs"):
+        st.rerun()
+    
+    for i, finished in enumerate(list(st.session_state.finished_jobs)):
+        if finished['error']:
+            st.error(f"Could not generate \"{finished['title']}\": {finished['error']}")
+            if st.button("Dismiss", key=f"dismiss_job_{i}"):
+                st.session_state.finished_jobs.remove(finished)
+                st.rerun()
+            continue
+        
+        st.success(f"🎉 Your AI-powered study plan \"{finished['title']}\" has been created successfully!")
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            if st.button("View Your New Study Plan", key=f"view_new_{finished['plan_id']}"):
+                st.session_state.finished_jobs.remove(finished)
+                select_plan(finished['plan_id'])
+                st.rerun()
+        with col2:
+            if st.button("Dismiss", key=f"dismiss_job_{i}"):
+                st.session_state.finished_jobs.remove(finished)
+                st.rerun()
 
 def render_study_plans():
     st.markdown("## 📋 Study Plans")
@@ -620,7 +1479,7 @@ def render_study_plans():
         """, unsafe_allow_html=True)
         
         if st.button("➕ Create Your First Plan", use_container_width=True):
-            st.session_state.current_view = 'create'
+            select_plan(None, 'create')
             st.rerun()
         return
     
@@ -630,17 +1489,47 @@ def render_study_plans():
         st.markdown("### Your Study Plans")
     with col2:
         filter_status = st.selectbox("Filter by Status", ["all", "active", "completed", "paused"])
+
+    # Export all active plans
+    active_plans = [p for p in st.session_state.study_plans.values() if p['status'] == 'active']
+    if active_plans:
+        render_export_buttons(active_plans, 'studbud_active_plans', 'active')
     
+    # Search plans and tasks
+    query = st.text_input("🔍 Search plans and tasks", placeholder="e.g., calc, mock exams, literature review")
+    if query:
+        results = st.session_state.search_index.search(query)
+
+        st.markdown(f"**{len(results)} result{'s' if len(results) != 1 else ''}** for \"{query}\"")
+        if not results and min(map(len, tokenize(query)), default=SEARCH_MIN_PREFIX) < SEARCH_MIN_PREFIX:
+            st.caption(f"Words shorter than {SEARCH_MIN_PREFIX} letters only match whole words; keep typing to search by prefix.")
+        for i, result in enumerate(results):
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.markdown(f"""
+                <div class="task-card">
+                    <span style="color: rgba(255,255,255,0.6); font-size: 0.8rem;">{'📋 PLAN' if result['kind'] == 'plan' else '📝 TASK'}</span>
+                    <h4 style="color: white; margin: 0;">{result['title']}</h4>
+                    <p style="color: rgba(255,255,255,0.7); margin: 0; font-size: 0.9rem;">{result['context']}</p>
+                </div>
+                """, unsafe_allow_html=True)
+            with col2:
+                if st.button("Open", key=f"search_result_{i}"):
+                    select_plan(result['plan_id'])
+                    st.rerun()
+        st.markdown("---")
+
     # Filter plans
-    filtered_plans = st.session_state.study_plans
+    filtered_plans = list(st.session_state.study_plans.values())
     if filter_status != "all":
-        filtered_plans = [p for p in st.session_state.study_plans if p['status'] == filter_status]
+        filtered_plans = [p for p in filtered_plans if p['status'] == filter_status]
     
     # Display plans
     for plan in filtered_plans:
-        progress = (plan['completed_hours'] / plan['total_hours'] * 100) if plan['total_hours'] > 0 else 0
-        completed_tasks = len([t for t in plan['tasks'] if t['status'] == 'completed'])
-        total_tasks = len(plan['tasks'])
+        summary = plan_summary(plan)
+        progress = summary['progress']
+        completed_tasks = summary['completed_tasks']
+        total_tasks = summary['total_tasks']
         
         days_left = (datetime.strptime(plan['end_date'], '%Y-%m-%d') - datetime.now()).days
         
@@ -708,44 +1597,45 @@ def render_study_plans():
         col1, col2, col3 = st.columns([1, 1, 1])
         with col1:
             if st.button(f"📖 View Details", key=f"view_{plan['id']}"):
-                st.session_state.selected_plan = plan
-                st.session_state.current_view = 'plan_detail'
+                select_plan(plan['id'])
                 st.rerun()
         
         with col2:
             status_button_text = "⏸️ Pause" if plan['status'] == 'active' else "▶️ Resume"
             if st.button(status_button_text, key=f"toggle_{plan['id']}"):
                 plan['status'] = 'paused' if plan['status'] == 'active' else 'active'
+                touch_plan(plan['id'])
+                record_action('toggle_plan_status', plan_id=plan['id'])
                 st.rerun()
         
         with col3:
             if st.button("🗑️ Delete", key=f"delete_{plan['id']}"):
-                st.session_state.study_plans.remove(plan)
+                delete_plan(plan['id'])
+                record_action('delete_plan', plan_id=plan['id'])
                 st.rerun()
 
 def render_plan_detail():
-    if not st.session_state.selected_plan:
-        st.session_state.current_view = 'plans'
+    plan = get_plan(st.session_state.selected_plan_id)
+    if not plan:
+        select_plan(None, 'plans')
         st.rerun()
         return
     
-    plan = st.session_state.selected_plan
-    
     # Header with back button
     col1, col2 = st.columns([1, 4])
     with col1:
         if st.button("← Back to Plans"):
-            st.session_state.selected_plan = None
-            st.session_state.current_view = 'plans'
+            select_plan(None, 'plans')
             st.rerun()
     
     with col2:
         st.markdown(f"## 📖 {plan['title']}")
     
     # Plan overview
-    progress = (plan['completed_hours'] / plan['total_hours'] * 100) if plan['total_hours'] > 0 else 0
-    completed_tasks = len([t for t in plan['tasks'] if t['status'] == 'completed'])
-    total_tasks = len(plan['tasks'])
+    summary = plan_summary(plan)
+    progress = summary['progress']
+    completed_tasks = summary['completed_tasks']
+    total_tasks = summary['total_tasks']
     
     st.markdown(f"""
     <div class="study-card">
@@ -787,26 +1677,47 @@ def render_plan_detail():
     </div>
     """, unsafe_allow_html=True)
     
+    render_export_buttons([plan], re.sub(r'[^A-Za-z0-9]+', '_', plan['title']).strip('_') or 'study_plan', plan['id'])
+    
     # Focus Areas
     if plan['weaknesses']:
         st.markdown("### 🎯 Focus Areas")
         weakness_tags = " ".join([f'<span style="background: rgba(244, 67, 54, 0.2); color: #f44336; padding: 0.3rem 0.8rem; border-radius: 15px; margin: 0.2rem; display: inline-block; font-size: 0.9rem;">{w}</span>' for w in plan['weaknesses']])
         st.markdown(f'<div style="margin-bottom: 2rem;">{weakness_tags}</div>', unsafe_allow_html=True)
     
+    # Study Time
+    study_log = st.session_state.study_log
+    daily_hours = study_log.daily_series(plan['id'])
+    if not daily_hours.empty:
+        st.markdown("### 📈 Study Time")
+        weekly_hours = study_log.weekly_series(plan['id'])
+        
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            fig = px.bar(daily_hours, x='date', y='hours', labels={'date': '', 'hours': 'Hours'})
+            fig.update_traces(marker_color='#4CAF50')
+            fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='white',
+                              height=250, margin=dict(l=0, r=0, t=10, b=0))
+            st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            st.metric("This Week", f"{study_log.week_hours(plan['id']):.1f}h")
+            st.metric("Weekly Average", f"{weekly_hours['hours'].mean():.1f}h")
+    
     # Tasks by Category
     st.markdown("### 📋 Tasks by Category")
     
-    # Group tasks by category
-    tasks_by_category = {}
-    for task in plan['tasks']:
-        category = task['category']
-        if category not in tasks_by_category:
-            tasks_by_category[category] = []
-        tasks_by_category[category].append(task)
+    tasks_by_category = summary['tasks_by_category']
+    
+    # Categories start collapsed; task cards and their widgets are only built for expanded ones
+    expanded_categories = st.session_state.expanded_categories
     
     for category, tasks in tasks_by_category.items():
         category_completed = len([t for t in tasks if t['status'] == 'completed'])
         category_progress = (category_completed / len(tasks)) * 100
+        category_overdue = len([t for t in tasks if t['status'] == 'pending' and t['urgency'] == 'overdue'])
+        next_due = min((t['due_date'] for t in tasks if t['status'] == 'pending'), default=None)
+        category_key = (plan['id'], category)
+        is_expanded = category_key in expanded_categories
         
         st.markdown(f"""
         <div class="study-card">
@@ -815,17 +1726,32 @@ def render_plan_detail():
                 <span style="color: rgba(255,255,255,0.7);">{category_completed}/{len(tasks)} completed</span>
             </div>
             
-            <div class="progress-bar" style="margin-bottom: 1.5rem;">
+            <div class="progress-bar" style="margin-bottom: 1rem;">
                 <div class="progress-fill" style="width: {category_progress}%;"></div>
             </div>
+            
+            <div style="display: flex; gap: 2rem; color: rgba(255,255,255,0.7); font-size: 0.8rem;">
+                <span>{f'📅 Next due {next_due}' if next_due else '✅ All done'}</span>
+                {f'<span style="color: #f44336;">⚠️ {category_overdue} overdue</span>' if category_overdue else ''}
+            </div>
         </div>
         """, unsafe_allow_html=True)
         
+        if st.button(f"{'▾ Hide' if is_expanded else '▸ Show'} {len(tasks)} task{'s' if len(tasks) != 1 else ''}", key=f"expand_{plan['id']}_{category}"):
+            if is_expanded:
+                expanded_categories.discard(category_key)
+            else:
+                expanded_categories.add(category_key)
+            record_action('expand_category', plan_id=plan['id'], category=category)
+            st.rerun()
+        
+        if not is_expanded:
+            continue
+        
         for task in tasks:
-            due_date = datetime.strptime(task['due_date'], '%Y-%m-%d')
-            days_until_due = (due_date - datetime.now()).days
-            is_overdue = days_until_due < 0
-            is_urgent = 0 <= days_until_due <= 2
+            days_left = days_until_due(task)
+            is_overdue = task['urgency'] == 'overdue'
+            is_urgent = task['urgency'] == 'due_soon'
             
             priority_colors = {
                 'high': '#f44336',
@@ -835,7 +1761,7 @@ def render_plan_detail():
             
             task_class = "completed-task" if task['status'] == 'completed' else f"{task['priority']}-priority"
             
-            urgency_text = "Due Today" if days_until_due == 0 else f"Due in {days_until_due} days" if days_until_due > 0 else f"{abs(days_until_due)} days overdue"
+            urgency_text = "Due Today" if days_left == 0 else f"Due in {days_left} days" if days_left > 0 else f"{abs(days_left)} days overdue"
             urgency_color = "#f44336" if is_overdue else "#ff9800" if is_urgent else "rgba(255,255,255,0.7)"
             
             st.markdown(f"""
@@ -869,23 +1795,93 @@ def render_plan_detail():
             if st.button(f"{'Mark as Pending' if task['status'] == 'completed' else 'Mark as Completed'}", 
                         key=f"toggle_task_{task['id']}"):
                 task['status'] = 'pending' if task['status'] == 'completed' else 'completed'
-                task['completed_hours'] = task['estimated_hours'] if task['status'] == 'completed' else 0
+                logged_hours = st.session_state.study_log.task_hours(task['id'])
+                task['completed_hours'] = max(logged_hours, task['estimated_hours']) if task['status'] == 'completed' else logged_hours
+                get_urgency_monitor().track_task(plan, task)
                 
                 # Update plan completed hours
                 plan['completed_hours'] = sum(t['completed_hours'] for t in plan['tasks'])
-                
-                # Update the plan in session state
-                for i, p in enumerate(st.session_state.study_plans):
-                    if p['id'] == plan['id']:
-                        st.session_state.study_plans[i] = plan
-                        break
-                
-                st.session_state.selected_plan = plan
+                touch_plan(plan['id'])
+                record_action('toggle_task', plan_id=plan['id'], task_id=task['id'])
                 st.rerun()
+            
+            # Log a study session against the task
+            if task['status'] == 'pending':
+                col1, col2 = st.columns([1, 1])
+                with col1:
+                    session_hours = st.number_input("Hours studied", min_value=0.25, max_value=12.0, value=1.0, step=0.25,
+                                                    key=f"log_hours_{task['id']}")
+                with col2:
+                    if st.button("⏱️ Log Study Time", key=f"log_task_{task['id']}"):
+                        study_log.log(plan['id'], task['id'], session_hours)
+                        task['completed_hours'] = study_log.task_hours(task['id'])
+                        plan['completed_hours'] = sum(t['completed_hours'] for t in plan['tasks'])
+                        touch_plan(plan['id'])
+                        record_action('log_time', plan_id=plan['id'], task_id=task['id'], hours=session_hours)
+                        st.rerun()
+
+def render_cohort_analytics():
+    st.markdown("## 🏫 Cohort Analytics")
+    
+    registry = get_plan_registry()
+    stats = cohort_stats(registry, registry.version, date.today().isoformat())
+    
+    if not stats['plans']:
+        st.info("No study plans across active sessions yet.")
+        return
+    
+    completion_rate = (stats['tasks_completed'] / stats['tasks'] * 100) if stats['tasks'] else 0
+    
+    col1, col2, col3, col4 = st.columns(4)
+    for col, value, label, color in [
+        (col1, stats['students'], "Students", "#4CAF50"),
+        (col2, stats['plans'], "Study Plans", "#2196F3"),
+        (col3, f"{completion_rate:.1f}%", "Task Completion", "#9C27B0"),
+        (col4, stats['tasks_overdue'], "Overdue Tasks", "#f44336")
+    ]:
+        with col:
+            st.markdown(f"""
+            <div class="metric-card">
+                <h2 style="color: {color}; margin: 0;">{value}</h2>
+                <p style="color: white; margin: 0;">{label}</p>
+            </div>
+            """, unsafe_allow_html=True)
+    
+    subjects = pd.DataFrame([
+        {
+            'Subject': name,
+            'Plans': s['plans'],
+            'Tasks': s['tasks'],
+            'Completion %': round(s['tasks_completed'] / s['tasks'] * 100, 1) if s['tasks'] else 0,
+            'Overdue': s['tasks_overdue'],
+            'Planned Hours': round(s['estimated_hours'], 1),
+            'Studied Hours': round(s['completed_hours'], 1)
+        }
+        for name, s in stats['subjects'].items()
+    ]).sort_values('Planned Hours', ascending=False)
+    
+    st.markdown("### ⏰ Hours by Subject")
+    fig = go.Figure([
+        go.Bar(name='Planned', x=subjects['Subject'], y=subjects['Planned Hours'], marker_color='#667eea'),
+        go.Bar(name='Studied', x=subjects['Subject'], y=subjects['Studied Hours'], marker_color='#4CAF50')
+    ])
+    fig.update_layout(barmode='group', paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='white',
+                      height=350, margin=dict(l=0, r=0, t=10, b=0))
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.markdown("### 📚 Subjects")
+    st.dataframe(subjects, use_container_width=True, hide_index=True)
+    
+    status_counts = ", ".join(f"{count} {status}" for status, count in sorted(stats['plans_by_status'].items()))
+    st.caption(f"{stats['tasks']:,} tasks in {status_counts} plans · {stats['recomputed']} plan(s) recomputed in {stats['shards']} shard(s)"
+               f"{' in parallel' if stats['parallel'] else ''} · computed in {stats['elapsed_ms']:.0f} ms for data version {stats['version']}")
 
 def main():
+    import_plans()
+    collect_plan_jobs()
     render_header()
     render_sidebar()
+    render_plan_jobs()
     
     # Main content area
     if st.session_state.current_view == 'dashboard':
@@ -896,6 +1892,13 @@ def main():
         render_study_plans()
     elif st.session_state.current_view == 'plan_detail':
         render_plan_detail()
+    elif st.session_state.current_view == 'cohort' and ADMIN_MODE:
+        render_cohort_analytics()
+    
+    # Poll running plan jobs; any user interaction interrupts the wait
+    if st.session_state.plan_jobs:
+        time.sleep(PLAN_JOB_POLL_SECONDS)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
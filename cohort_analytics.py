@@ -0,0 +1,123 @@
+# Cohort-wide aggregation over many students' study plans.
+#
+# Every plan is reduced to a small partial aggregate and the partials are
+# merged. Partials are cached on the plan's version and the day, so a refresh
+# only reduces plans that changed; a large batch of stale plans can be split
+# into shards and reduced in a process pool. Lives outside app.py so pool
+# workers can resolve these functions by module.
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+PARALLEL_TASK_THRESHOLD = 200_000
+SHARDS_PER_WORKER = 4
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def empty_partial() -> Dict[str, Any]:
+    return {
+        'plans': 0,
+        'plans_by_status': {},
+        'tasks': 0,
+        'tasks_completed': 0,
+        'tasks_overdue': 0,
+        'subjects': {}
+    }
+
+
+def aggregate_shard(plans: List[Dict[str, Any]], today: str) -> Dict[str, Any]:
+    partial = empty_partial()
+    plans_by_status = partial['plans_by_status']
+    subjects = partial['subjects']
+
+    for plan in plans:
+        partial['plans'] += 1
+        plans_by_status[plan['status']] = plans_by_status.get(plan['status'], 0) + 1
+
+        subject = subjects.get(plan['subject'].strip().title())
+        if subject is None:
+            subject = subjects[plan['subject'].strip().title()] = {
+                'plans': 0, 'tasks': 0, 'tasks_completed': 0, 'tasks_overdue': 0,
+                'estimated_hours': 0.0, 'completed_hours': 0.0
+            }
+        subject['plans'] += 1
+
+        completed = overdue = 0
+        estimated_hours = completed_hours = 0.0
+        for task in plan['tasks']:
+            estimated_hours += task['estimated_hours']
+            completed_hours += task['completed_hours']
+            if task['status'] == 'completed':
+                completed += 1
+            # ISO dates compare correctly as strings
+            elif task['due_date'] < today:
+                overdue += 1
+
+        subject['tasks'] += len(plan['tasks'])
+        subject['tasks_completed'] += completed
+        subject['tasks_overdue'] += overdue
+        subject['estimated_hours'] += estimated_hours
+        subject['completed_hours'] += completed_hours
+
+    for subject in subjects.values():
+        partial['tasks'] += subject['tasks']
+        partial['tasks_completed'] += subject['tasks_completed']
+        partial['tasks_overdue'] += subject['tasks_overdue']
+    return partial
+
+
+def merge_partials(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    merged = empty_partial()
+    for partial in partials:
+        for key in ('plans', 'tasks', 'tasks_completed', 'tasks_overdue'):
+            merged[key] += partial[key]
+        for status, count in partial['plans_by_status'].items():
+            merged['plans_by_status'][status] = merged['plans_by_status'].get(status, 0) + count
+        for name, stats in partial['subjects'].items():
+            subject = merged['subjects'].setdefault(name, dict.fromkeys(stats, 0))
+            for key, value in stats.items():
+                subject[key] += value
+    return merged
+
+
+def shard(plans: List[Dict[str, Any]], count: int) -> List[List[Dict[str, Any]]]:
+    size = max(1, -(-len(plans) // max(1, count)))
+    return [plans[i:i + size] for i in range(0, len(plans), size)]
+
+
+def aggregate_plans(plans: List[Dict[str, Any]], today: str) -> List[Dict[str, Any]]:
+    return [aggregate_shard([plan], today) for plan in plans]
+
+
+def compute_cohort_stats(plans: List[Tuple[Any, int, Dict[str, Any]]], today: str, workers: int = 1,
+                         cache: Optional[Dict[Any, Tuple[Any, Dict[str, Any]]]] = None) -> Dict[str, Any]:
+    # plans are (key, version, plan) triples; cache maps key -> ((version, today), partial)
+    # and is updated in place, so only new or changed plans are reduced again
+    cache = {} if cache is None else cache
+    current = {key: (version, today) for key, version, _ in plans}
+    for key in [key for key in cache if key not in current]:
+        del cache[key]
+
+    stale = [(key, plan) for key, version, plan in plans if cache.get(key, (None,))[0] != current[key]]
+    stale_plans = [plan for _, plan in stale]
+    parallel = workers > 1 and sum(len(plan['tasks']) for plan in stale_plans) >= PARALLEL_TASK_THRESHOLD
+
+    if not parallel:
+        shards = shard(stale_plans, 1)
+        partials = aggregate_plans(stale_plans, today)
+    else:
+        # Each worker gets its shard explicitly; a fresh server process forks
+        # the workers, so the app process itself is never forked
+        shards = shard(stale_plans, workers * SHARDS_PER_WORKER)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(POOL_START_METHOD)) as pool:
+            partials = [p for results in pool.map(aggregate_plans, shards, [today] * len(shards)) for p in results]
+
+    for (key, _), partial in zip(stale, partials):
+        cache[key] = (current[key], partial)
+
+    stats = merge_partials([cache[key][1] for key in current])
+    stats['recomputed'] = len(stale)
+    stats['shards'] = len(shards)
+    stats['parallel'] = parallel
+    return stats
@@ -0,0 +1,244 @@
+# Headless load test for Studbud.
+#
+# Drives app.py through Streamlit's testing API (no browser, no network) with
+# N simulated users, each holding its own session state, and reports per-view
+# latency percentiles, memory growth per session and overall throughput.
+#
+# AppTest keeps a process-wide runtime, so sessions inside one worker process
+# are interleaved step by step (all of them stay alive, like sessions on one
+# server) and parallelism comes from spreading users over worker processes.
+#
+#   python load_test.py --users 20 --workers 4 --plans 3 --actions 30
+
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Any
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+SUBJECTS = ['Mathematics', 'Biology', 'World History', 'English Literature', 'Business Management', 'Computer Science']
+SUBMIT_LABEL = '🚀 Generate AI Study Plan'
+JOB_POLL_SECONDS = 0.05
+WEAKNESSES = ['Calculus', 'Statistics', 'Chemistry', 'Grammar', 'World Wars', 'Finance', 'Algorithms']
+
+
+def submit_button(at: AppTest):
+    return next(b for b in at.button if b.label == SUBMIT_LABEL)
+
+
+def rss_bytes() -> int:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+    summary = {}
+    for view, samples in sorted(latencies.items()):
+        ms = np.array(samples) * 1000
+        summary[view] = {
+            'count': len(samples),
+            'errors': errors.get(view, 0),
+            'p50_ms': float(np.percentile(ms, 50)),
+            'p90_ms': float(np.percentile(ms, 90)),
+            'p99_ms': float(np.percentile(ms, 99)),
+            'max_ms': float(ms.max())
+        }
+    return summary
+
+
+class LoadRecorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, view: str, seconds: float, failed: bool):
+        self.latencies.setdefault(view, []).append(seconds)
+        if failed:
+            self.errors[view] = self.errors.get(view, 0) + 1
+
+
+class SimulatedUser:
+    def __init__(self, user_id: int, recorder: LoadRecorder, args: argparse.Namespace):
+        self.user_id = user_id
+        self.recorder = recorder
+        self.args = args
+        self.rng = random.Random(args.seed + user_id)
+        self.at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+
+    def step(self, view: str, action):
+        start = time.perf_counter()
+        failed = False
+        try:
+            action()
+            self.at.run()
+            failed = len(self.at.exception) > 0
+        except Exception:
+            failed = True
+        self.recorder.record(view, time.perf_counter() - start, failed)
+        yield
+
+    # Each action is a generator yielding after every app run, so a worker can
+    # interleave many live sessions
+    def run(self):
+        yield from self.step('initial_load', lambda: None)
+
+        for i in range(self.args.plans):
+            yield from self.create_plan(i)
+
+        actions = [self.view_dashboard, self.view_plans, self.view_plan_detail, self.toggle_task, self.log_time]
+        for _ in range(self.args.actions):
+            yield from self.rng.choice(actions)()
+
+    def state(self, key: str):
+        return self.at.session_state[key] if key in self.at.session_state else None
+
+    def create_plan(self, index: int):
+        yield from self.step('nav_create', lambda: self.at.sidebar.button[2].click())
+        known = set(self.state('study_plans') or {})
+        start = datetime.now().date() - timedelta(days=self.rng.randint(0, 30))
+
+        def fill_and_submit():
+            self.at.text_input[0].input(f'User {self.user_id} Plan {index}')
+            self.at.text_input[1].input(self.rng.choice(SUBJECTS))
+            self.at.selectbox[0].set_value(self.rng.choice(['exam', 'project', 'subject']))
+            self.at.date_input[0].set_value(start)
+            self.at.date_input[1].set_value(start + timedelta(days=self.rng.randint(14, self.args.max_days)))
+            self.at.text_area[0].input('\n'.join(self.rng.sample(WEAKNESSES, 2)))
+            submit_button(self.at).click()
+
+        # Submitting queues a job and the app polls it with reruns, which AppTest
+        # follows; generation latency runs from submit until the plan lands,
+        # waiting out any job still pending between other sessions' steps
+        submitted = time.perf_counter()
+        yield from self.step('create_plan', fill_and_submit)
+        while (not set(self.state('study_plans') or {}) - known and self.state('plan_jobs')
+               and time.perf_counter() - submitted < self.args.timeout):
+            yield
+            time.sleep(JOB_POLL_SECONDS)
+            try:
+                self.at.run()
+            except Exception:
+                break
+        created = bool(set(self.state('study_plans') or {}) - known)
+        self.recorder.record('plan_generation', time.perf_counter() - submitted, failed=not created)
+
+    def pick_plan(self):
+        plans = list((self.state('study_plans') or {}).values())
+        return self.rng.choice(plans) if plans else None
+
+    def view_dashboard(self):
+        yield from self.step('dashboard', lambda: self.at.sidebar.button[0].click())
+
+    def view_plans(self):
+        yield from self.step('plans', lambda: self.at.sidebar.button[1].click())
+
+    def view_plan_detail(self):
+        yield from self.view_plans()
+        plan = self.pick_plan()
+        if plan is None:
+            return
+        yield from self.step('plan_detail', lambda: self.at.button(key=f"view_{plan['id']}").click())
+
+        expand_buttons = [b for b in self.at.button if b.key and b.key.startswith('expand_')]
+        if expand_buttons:
+            yield from self.step('expand_category', lambda: self.rng.choice(expand_buttons).click())
+
+    def toggle_task(self):
+        buttons = [b for b in self.at.button if b.key and b.key.startswith('toggle_task_')]
+        if not buttons:
+            return (yield from self.view_plan_detail())
+        yield from self.step('toggle_task', lambda: self.rng.choice(buttons).click())
+
+    def log_time(self):
+        buttons = [b for b in self.at.button if b.key and b.key.startswith('log_task_')]
+        if not buttons:
+            return (yield from self.view_plan_detail())
+        yield from self.step('log_time', lambda: self.rng.choice(buttons).click())
+
+
+def run_worker(user_ids: List[int], args: argparse.Namespace) -> Dict[str, Any]:
+    recorder = LoadRecorder()
+    sessions = [SimulatedUser(i, recorder, args).run() for i in user_ids]
+
+    # Warm up with every session's initial load so one-off imports and runtime
+    # setup are not counted as per-session growth
+    for session in sessions:
+        next(session)
+    rss_before = rss_bytes()
+
+    # Round-robin one step at a time across every live session
+    while sessions:
+        for session in list(sessions):
+            try:
+                next(session)
+            except StopIteration:
+                sessions.remove(session)
+
+    return {
+        'latencies': recorder.latencies,
+        'errors': recorder.errors,
+        'rss_growth': rss_bytes() - rss_before
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless load test for the Studbud Streamlit app')
+    parser.add_argument('--users', type=int, default=10, help='number of simulated sessions')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes sharing the sessions')
+    parser.add_argument('--plans', type=int, default=2, help='plans created per session')
+    parser.add_argument('--actions', type=int, default=20, help='random view/task actions per session')
+    parser.add_argument('--max-days', type=int, default=120, help='longest plan duration in days')
+    parser.add_argument('--timeout', type=float, default=60, help='per-run script timeout in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    workers = max(1, min(args.workers, args.users))
+    shards = [list(range(args.users))[i::workers] for i in range(workers)]
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run_worker, shards, [args] * workers))
+    elapsed = time.perf_counter() - started
+
+    latencies, errors = {}, {}
+    for result in results:
+        for view, samples in result['latencies'].items():
+            latencies.setdefault(view, []).extend(samples)
+        for view, count in result['errors'].items():
+            errors[view] = errors.get(view, 0) + count
+    rss_growth = sum(result['rss_growth'] for result in results)
+
+    views = summarize(latencies, errors)
+    total_steps = sum(v['count'] for v in views.values())
+    report = {
+        'users': args.users,
+        'workers': workers,
+        'elapsed_s': elapsed,
+        'throughput_steps_per_s': total_steps / elapsed if elapsed else 0,
+        'rss_growth_mb': rss_growth / 2**20,
+        'rss_growth_per_session_kb': rss_growth / 1024 / max(1, args.users),
+        'views': views
+    }
+
+    print(f"{'view':<16}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for view, stats in views.items():
+        print(f"{view:<16}{stats['count']:>7}{stats['errors']:>8}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}"
+              f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    print(f"\n{total_steps} steps in {elapsed:.1f}s ({report['throughput_steps_per_s']:.1f} steps/s)")
+    print(f"RSS growth: {report['rss_growth_mb']:.1f} MB across {workers} workers, {report['rss_growth_per_session_kb']:.0f} KB per session")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+# Replays a Studbud performance trace headlessly.
+#
+# Traces are recorded from the app's sidebar ("Record performance trace") as
+# JSON lines of generator inputs and UI actions. The replayer restores the
+# recorded starting plans and study log, re-runs every action against app.py through
+# Streamlit's testing API and reports how long each step took, so a slow
+# session reported by a user can be profiled offline.
+#
+#   python replay_trace.py traces/trace-20261018-101500-ab12cd.jsonl --json replay.json
+
+import argparse
+import json
+import os
+import time
+from datetime import date
+from typing import Dict, List, Any
+
+from streamlit.testing.v1 import AppTest
+
+from load_test import APP_PATH, JOB_POLL_SECONDS, submit_button, summarize
+
+
+class TraceReplayer:
+    def __init__(self, timeout: float, realtime: bool):
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.realtime = realtime
+        # Recorded plan/task ids -> ids of the objects regenerated during replay
+        self.ids = {}
+        self.steps = []
+
+    def replay(self, events: List[Dict[str, Any]]):
+        self.at.run()
+        started = time.perf_counter()
+
+        for event in events:
+            if self.realtime:
+                time.sleep(max(0, event['t'] - (time.perf_counter() - started)))
+
+            handler = getattr(self, f"replay_{event['action']}", None)
+            if handler is None:
+                self.record(event['action'], 0, failed=True, note='unknown action')
+                continue
+            # A step that cannot be set up (e.g. its plan failed to generate
+            # earlier) is recorded as failed and the replay carries on
+            try:
+                handler(event)
+            except Exception as e:
+                self.record(event['action'], 0, failed=True, note=str(e) or type(e).__name__)
+
+    def record(self, action: str, seconds: float, failed: bool, note: str = ''):
+        self.steps.append({'action': action, 'ms': seconds * 1000, 'failed': failed, 'note': note})
+
+    def timed(self, action: str, interact):
+        start = time.perf_counter()
+        try:
+            interact()
+            self.at.run()
+            failed = len(self.at.exception) > 0
+            note = self.at.exception[0].message.splitlines()[0] if failed else ''
+        except Exception as e:
+            failed, note = True, str(e)
+        self.record(action, time.perf_counter() - start, failed, note)
+
+    def state(self, key: str):
+        return self.at.session_state[key] if key in self.at.session_state else None
+
+    def plan(self, recorded_id: str) -> Dict[str, Any]:
+        plan = (self.state('study_plans') or {}).get(self.ids.get(recorded_id, recorded_id))
+        if plan is None:
+            raise LookupError(f"plan {recorded_id} is not in the replayed session")
+        return plan
+
+    def show(self, view: str, plan_id: str = None):
+        if self.state('current_view') != view or self.state('selected_plan_id') != plan_id:
+            self.at.session_state['selected_plan_id'] = plan_id
+            self.at.session_state['current_view'] = view
+            self.at.run()
+
+    def show_task(self, event: Dict[str, Any]) -> str:
+        plan = self.plan(event['plan_id'])
+        task_id = self.ids.get(event['task_id'], event['task_id'])
+        task = next((t for t in plan['tasks'] if t['id'] == task_id), None)
+        if task is None:
+            raise LookupError(f"task {event['task_id']} is not in plan {event['plan_id']}")
+
+        self.show('plan_detail', plan['id'])
+        expanded = self.state('expanded_categories')
+        if (plan['id'], task['category']) not in expanded:
+            expanded.add((plan['id'], task['category']))
+            self.at.session_state['expanded_categories'] = expanded
+            self.at.run()
+        return task_id
+
+    def replay_snapshot(self, event: Dict[str, Any]):
+        def restore():
+            self.at.session_state['plans_to_import'] = list(event['plans'])
+            self.at.session_state['study_log_to_import'] = list(event.get('study_log', []))
+
+        self.timed('snapshot', restore)
+
+    def replay_view(self, event: Dict[str, Any]):
+        plan_id = self.ids.get(event['plan_id'], event['plan_id'])
+
+        def navigate():
+            self.at.session_state['selected_plan_id'] = plan_id
+            self.at.session_state['current_view'] = event['view']
+
+        self.timed(f"view:{event['view']}", navigate)
+
+    def replay_create_plan(self, event: Dict[str, Any]):
+        form_data = event['form_data']
+        known = set(self.state('study_plans') or {})
+        self.show('create')
+
+        def submit():
+            self.at.text_input[0].input(form_data['title'])
+            self.at.text_input[1].input(form_data['subject'])
+            self.at.selectbox[0].set_value(form_data['type'])
+            self.at.date_input[0].set_value(date.fromisoformat(form_data['start_date']))
+            self.at.date_input[1].set_value(date.fromisoformat(form_data['end_date']))
+            self.at.slider[0].set_value(form_data['daily_hours'])
+            self.at.text_area[0].input('\n'.join(form_data['weaknesses']))
+            self.at.multiselect[0].set_value(form_data['learning_methods'])
+            self.at.text_area[1].input(form_data.get('goals', ''))
+            submit_button(self.at).click()
+
+        self.timed('create_plan:submit', submit)
+
+        # Generation runs on the app's worker pool; poll until the plan lands
+        start = time.perf_counter()
+        while not set(self.state('study_plans') or {}) - known and self.state('plan_jobs'):
+            time.sleep(JOB_POLL_SECONDS)
+            self.at.run()
+
+        created = set(self.state('study_plans') or {}) - known
+        self.record('create_plan:ready', time.perf_counter() - start, failed=not created,
+                    note='' if created else 'plan was not generated')
+        if not created:
+            return
+
+        new_plan = self.state('study_plans')[created.pop()]
+        self.ids[event['plan_id']] = new_plan['id']
+        for recorded_id, task in zip(event['task_ids'], new_plan['tasks']):
+            self.ids[recorded_id] = task['id']
+
+    def replay_expand_category(self, event: Dict[str, Any]):
+        plan = self.plan(event['plan_id'])
+        self.show('plan_detail', plan['id'])
+        self.timed('expand_category', lambda: self.at.button(key=f"expand_{plan['id']}_{event['category']}").click())
+
+    def replay_toggle_task(self, event: Dict[str, Any]):
+        task_id = self.show_task(event)
+        self.timed('toggle_task', lambda: self.at.button(key=f"toggle_task_{task_id}").click())
+
+    def replay_log_time(self, event: Dict[str, Any]):
+        task_id = self.show_task(event)
+
+        def log():
+            self.at.number_input(key=f"log_hours_{task_id}").set_value(event['hours'])
+            self.at.button(key=f"log_task_{task_id}").click()
+
+        self.timed('log_time', log)
+
+    def replay_toggle_plan_status(self, event: Dict[str, Any]):
+        plan = self.plan(event['plan_id'])
+        self.show('plans')
+        self.timed('toggle_plan_status', lambda: self.at.button(key=f"toggle_{plan['id']}").click())
+
+    def replay_delete_plan(self, event: Dict[str, Any]):
+        plan = self.plan(event['plan_id'])
+        self.show('plans')
+        self.timed('delete_plan', lambda: self.at.button(key=f"delete_{plan['id']}").click())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recorded Studbud trace headlessly with per-step timing')
+    parser.add_argument('trace', help='trace file recorded from the app (JSON lines)')
+    parser.add_argument('--realtime', action='store_true', help='keep the recorded gaps between actions')
+    parser.add_argument('--timeout', type=float, default=120, help='per-run script timeout in seconds')
+    parser.add_argument('--json', help='also write the step timings to this file')
+    args = parser.parse_args()
+
+    with open(args.trace, encoding='utf-8') as f:
+        events = [json.loads(line) for line in f if line.strip()]
+
+    replayer = TraceReplayer(args.timeout, args.realtime)
+    replayer.replay(events)
+
+    print(f"{'#':>4}  {'action':<22}{'ms':>10}  note")
+    for i, step in enumerate(replayer.steps):
+        print(f"{i:>4}  {step['action']:<22}{step['ms']:>10.1f}  {'FAILED ' if step['failed'] else ''}{step['note']}")
+
+    latencies, errors = {}, {}
+    for step in replayer.steps:
+        latencies.setdefault(step['action'], []).append(step['ms'] / 1000)
+        if step['failed']:
+            errors[step['action']] = errors.get(step['action'], 0) + 1
+    summary = summarize(latencies, errors)
+
+    print(f"\n{'action':<22}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'max ms':>10}")
+    for action, stats in summary.items():
+        print(f"{action:<22}{stats['count']:>7}{stats['errors']:>8}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    print(f"\nReplayed {len(events)} events from {os.path.basename(args.trace)} in "
+          f"{sum(s['ms'] for s in replayer.steps) / 1000:.1f}s of timed steps")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'trace': args.trace, 'steps': replayer.steps, 'summary': summary}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()